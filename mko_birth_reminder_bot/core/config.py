@@ -87,6 +87,8 @@ class CsvSettings(BaseModel):
     class ReadDataSettings(BaseModel):
         path: Path | str = Field(default=Path("tmp"))
         delete_after: int = 3
+        chunk_size: int = 10000
+        max_upload_bytes: int = 10 * 1024 * 1024
         from_csv: dict[str, Any]
 
         @field_validator("path", mode="before")
@@ -112,10 +114,30 @@ class TelethonApiSettings(BaseModel):
     """
     Configuration for the Telethon API.
     """
-    menu: dict[str, list[list[dict[str, str]]]]
+    menu: dict[str, list[list[tuple[str, str]]]]
     bot_token: str
     client: dict[str, Any]
     throttle_limits: dict[str, list[int]]
+    max_sessions: int = 10000
+    session_ttl: int = 1800
+    import_workers: int = 2
+    debounce_interval: float = 0.3
+    send_rate: float = 30
+
+    @field_validator("menu", mode="before")
+    @classmethod
+    def validate_menu(cls, menu: dict[str, list[list[Any]]]) -> dict[str, list[list[Any]]]:
+        """
+        Converts the `{button: text}` items of the menu rows into `(button, text)` pairs.
+        """
+        return {
+            name: [
+                [pair for item in row
+                 for pair in (item.items() if isinstance(item, dict) else [item])]
+                for row in level
+            ]
+            for name, level in menu.items()
+        }
 
 # Reminder settings
 class ReminderSettings(BaseModel):
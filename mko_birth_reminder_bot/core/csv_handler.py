@@ -1,10 +1,11 @@
 import logging
+import contextlib
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import pandas as pd
 from datetime import datetime, timedelta
 from .errors import *
-from .utils import parse_date, clean_text, list_files_in_directory
+from .utils import parse_date_column, list_files_in_directory, TEXT_CLEAN_PATTERN
 from .config import CONFIG
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,7 @@ class CSVHandler:
 
         self.import_path = CONFIG.CSV.READ_DATA.path
         self.reader_settings = CONFIG.CSV.READ_DATA.from_csv
+        self.chunk_size = CONFIG.CSV.READ_DATA.chunk_size
 
         self.export_path = CONFIG.CSV.EXPORT_DATA.path
         self.export_settings = CONFIG.CSV.EXPORT_DATA.to_csv
@@ -43,23 +45,39 @@ class CSVHandler:
         :param csv_file: Name of the CSV file to read.
         :return: DataFrame with the CSV data or raises an exception on failure.
         """
+        return next(self.read_csv_chunks(csv_file))
+
+    def read_csv_chunks(self, csv_file: str, chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Reads a CSV file into pandas DataFrames of at most `chunksize` rows,
+        so the memory used is bounded by the chunk size rather than the file size.
+
+        :param csv_file: Name of the CSV file to read.
+        :param chunksize: Number of rows per chunk. If None the whole file is returned as a single chunk.
+        :return: Iterator over DataFrames with the CSV data, raises an exception on failure.
+        """
         file_path = Path(csv_file).resolve()
 
         if not file_path.is_file():
             file_path = (self.import_path / csv_file).resolve()
 
         try:
-            first_row = pd.read_csv(file_path, nrows=1, **self.reader_settings)
-            actual_columns = len(first_row.columns)
+            # the header is checked before reading the data,
+            # a file with a header only yields no chunks but still must have the right columns
+            header = pd.read_csv(file_path, nrows=0, **self.reader_settings)
+            actual_columns = len(header.columns)
             expected_columns = len(self.data_column_names)
 
             if actual_columns != expected_columns and actual_columns != expected_columns + 1:
                 raise ColumnMismatch(f"Expected {expected_columns} columns, but got {actual_columns}.")
 
-            df = pd.read_csv(file_path, **self.reader_settings)
-
+            if chunksize is None:
+                reader = contextlib.nullcontext([pd.read_csv(file_path, **self.reader_settings)])
+            else:
+                reader = pd.read_csv(file_path, chunksize=chunksize, **self.reader_settings)
+            with reader as chunks:
+                yield from chunks
             self.logger.info(f"Successfully read CSV file: {file_path.name}")
-            return df
 
         except FileNotFoundError:
             self.logger.error(f"CSV file not found: {file_path}")
@@ -106,20 +124,19 @@ class CSVHandler:
         """
         if dataframe.shape[1] == 0:
             return pd.DataFrame()
-        valid_rows = []
-        for _, row in dataframe.iterrows():
-            res = parse_date(row[date_column])
-            if res is None:
-                self.logger.warning(f"Invalid date format: {row[date_column]}. Row skipped.")
-            else:
-                row[date_column] = res.strftime(self.date_format)
-                valid_rows.append(row)
-        return pd.DataFrame(valid_rows)
+        parsed = parse_date_column(dataframe[date_column])
+        is_valid = parsed.notna()
+        for value in dataframe.loc[~is_valid, date_column]:
+            self.logger.warning(f"Invalid date format: {value}. Row skipped.")
+        dataframe = dataframe.loc[is_valid].copy()
+        dataframe[date_column] = parsed[is_valid].dt.strftime(self.date_format)
+        return dataframe
 
     @staticmethod
     def _clean_text_columns(dataframe: pd.DataFrame, column_names: List[str], date_column: str) -> pd.DataFrame:
         """
         Cleans text data in specified columns.
+        Digits-only values are kept as is, SQLite column affinity converts them on insert.
 
         :param dataframe: DataFrame containing the data.
         :param column_names: List of all column names.
@@ -131,7 +148,8 @@ class CSVHandler:
 
         for col in column_names:
             if col != date_column:
-                dataframe[col] = dataframe[col].astype(str).apply(clean_text)
+                dataframe[col] = dataframe[col].astype(str).str.strip().str.replace(
+                    TEXT_CLEAN_PATTERN, '', regex=True)
         return dataframe
 
     def remove_index_column_if_present(self, dataframe: pd.DataFrame) -> pd.DataFrame:
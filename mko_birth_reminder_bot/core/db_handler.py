@@ -1,7 +1,7 @@
 import sqlite3
 # import psycopg2
 import threading
-from typing import List, Tuple, Optional, Any, Dict, Literal, Union
+from typing import Iterable, List, Tuple, Optional, Any, Dict, Literal, Union
 from datetime import datetime, timedelta
 from pathlib import Path
 import pandas as pd
@@ -12,6 +12,39 @@ from .errors import *
 
 logger = logging.getLogger(__name__)
 
+IN_MEMORY_DB_PREFIXES = (':memory:', 'file::memory:')
+# The queries of each user address the user's own data table, so the SQL text differs per user,
+# the statement cache is sized for several active users instead of the sqlite3 default of 128
+STATEMENT_CACHE_SIZE = 512
+
+
+def sqlite_connect(db_path: str | Path) -> sqlite3.Connection:
+    """
+    Opens an SQLite connection configured for the bot.
+
+    In-memory databases (':memory:' or 'file::memory:?cache=shared' URI) skip the
+    disk oriented settings and keep the journal and temp storage in RAM.
+
+    Args:
+        db_path (str | Path): Path to the database file or in-memory database name.
+
+    Returns:
+        sqlite3.Connection: Configured connection.
+    """
+    db_path = str(db_path)
+    db_con = sqlite3.connect(db_path, check_same_thread=False, uri=db_path.startswith('file:'),
+                             cached_statements=STATEMENT_CACHE_SIZE)
+    db_con.row_factory = sqlite3.Row
+    if db_path.startswith(IN_MEMORY_DB_PREFIXES):
+        db_con.execute("PRAGMA journal_mode=MEMORY;")
+        db_con.execute("PRAGMA synchronous=OFF;")
+        db_con.execute("PRAGMA temp_store=MEMORY;")
+    else:
+        db_con.execute("PRAGMA journal_mode=WAL;")
+        db_con.execute("PRAGMA synchronous=NORMAL;")
+    db_con.execute("PRAGMA foreign_keys=ON;")
+    return db_con
+
 
 class DBHandler:
     """
@@ -33,11 +66,7 @@ class DBHandler:
         self.logger = logging.getLogger(__name__)
 
         if db_type == "sqlite":
-            self.db_con = sqlite3.connect(db_path, check_same_thread=False)
-            self.db_con.row_factory = sqlite3.Row
-            self.db_con.execute("PRAGMA journal_mode=WAL;")
-            self.db_con.execute("PRAGMA synchronous=NORMAL;")
-            self.db_con.execute("PRAGMA foreign_keys=ON;")
+            self.db_con = sqlite_connect(db_path)
             self.logger.info("SQLite initialized.")
 
         elif db_type == "postgresql":
@@ -53,7 +82,10 @@ class DBHandler:
 
 
 db_settings = CONFIG.DATABASE
-db_file = Path(db_settings.path, db_settings.db_file)
+if str(db_settings.db_file).startswith(IN_MEMORY_DB_PREFIXES):
+    db_file = str(db_settings.db_file)
+else:
+    db_file = Path(db_settings.path, db_settings.db_file)
 db_sqlite = DBHandler(db_type="sqlite", db_path=db_file)
 # db_pg = DBHandler(db_type="postgresql", pg_config={"dbname": "test", "user": "admin"})
 DB_CONNECTION = db_sqlite.db_con  # Global database connection
@@ -63,11 +95,6 @@ class DBHandler:
     """
     Class for working with the SQLite database.
     """
-    DATA_TO_SQL_PARAMS = {
-        'if_exists': 'append',
-        'index': False,
-        'method': 'multi',
-    }
 
     def __init__(self):
         """
@@ -82,7 +109,8 @@ class DBHandler:
             query: str,
             term: Optional[Tuple | List] = tuple(),
             fetch: Literal['all', 'one', None] = None,
-            raise_exceptions: bool = False
+            raise_exceptions: bool = False,
+            tuple_rows: bool = False
     ) -> Optional[Union[List[sqlite3.Row], sqlite3.Row]]:
         """
         Executes an SQL query.
@@ -92,11 +120,14 @@ class DBHandler:
             term (Optional[Tuple | List]): Query parameters.
             fetch (Literal['all', 'one', None]): Type of result to return.
             raise_exceptions (bool): Whether to raise exceptions on errors.
+            tuple_rows (bool): Whether to return plain tuples instead of sqlite3.Row objects.
 
         Returns:
             Optional[Union[List[sqlite3.Row], sqlite3.Row]]: Query results.
         """
         cursor = self.db_con.cursor()
+        if tuple_rows:
+            cursor.row_factory = None  # only this cursor, the connection keeps sqlite3.Row
         try:
             cursor.execute(query, term)
             match fetch:
@@ -221,24 +252,23 @@ class TGUserData(DBHandler):
         except TypeError as e:
             self.logger.error(f"Parameter tg_user_id should be integer. {e}")
 
-    def add_data(self, prepared_data: pd.DataFrame, sql_loader_settings: Optional[Dict[str, Any]] = None) -> int:
+    def add_data(self, prepared_data: pd.DataFrame) -> int:
         """
-        Adds data to the table.
+        Adds data to the table using a single `executemany` call inside one transaction.
 
         Args:
-            prepared_data (pd.DataFrame): Data to be added.
-            sql_loader_settings (Optional[Dict[str, Any]]): SQL loading settings.
+            prepared_data (pd.DataFrame): Data to be added, column names must match the table columns.
 
         Returns:
             int: Number of records added.
         """
-        if sql_loader_settings is None:
-            sql_loader_settings = self.DATA_TO_SQL_PARAMS
-        prepared_data.to_sql(
-            **sql_loader_settings,
-            name=self._data_tbl_name,
-            con=self.db_con
-        )
+        key_str = ', '.join(prepared_data.columns)
+        q_str = ', '.join(['?'] * prepared_data.shape[1])
+        query = f"INSERT INTO {self._data_tbl_name} ({key_str}) VALUES ({q_str})"
+        # convert numpy scalars and NaN to the python types sqlite3 can bind
+        values = prepared_data.astype(object).where(prepared_data.notna(), None).values.tolist()
+        with self.db_con:
+            self.db_con.executemany(query, values)
         self.logger.info(f"Added {prepared_data.shape[0]} records.")
         return prepared_data.shape[0]
 
@@ -426,10 +456,11 @@ class TGUserData(DBHandler):
         # (query, (start_date, end_date, end_date, start_date, end_date))
         return self.perform_query(query, params, fetch='all')
 
-    def _get_upcoming_dates(self, notice_period_days: int = 0, date: datetime | None = None) -> Optional[
-        Union[List[sqlite3.Row], sqlite3.Row]]:
+    def _get_upcoming_dates(self, notice_period_days: int = 0, date: datetime | None = None,
+                            tuple_rows: bool = False) -> Optional[Union[List[sqlite3.Row], sqlite3.Row]]:
         """
         Fetch users whose birthdays match their 'notice_period_days' days from the current date.
+        :param tuple_rows: return plain tuples instead of sqlite3.Row objects.
         :return: List of users with matching birthdays.
         """
         try:
@@ -445,11 +476,35 @@ class TGUserData(DBHandler):
                     SELECT * FROM {self._data_tbl_name}
                     WHERE strftime('%m-%d', {self.date_column}) = ?
                     """
-            return self.perform_query(query, (target_date_str,), fetch='all')
+            return self.perform_query(query, (target_date_str,), fetch='all', tuple_rows=tuple_rows)
+
+    def _get_upcoming_dates_bulk(self, notice_periods: Iterable[int], date: datetime | None = None,
+                                 tuple_rows: bool = False) -> Optional[Union[List[sqlite3.Row], sqlite3.Row]]:
+        """
+        Fetch users whose birthdays match any of the 'notice_periods' days from the current date,
+        with a single query instead of one `_get_upcoming_dates` call per period.
+        :param tuple_rows: return plain tuples instead of sqlite3.Row objects.
+        :return: List of users with matching birthdays, each user is listed once.
+        """
+        try:
+            current_date = date or datetime.now()
+            target_dates = {(current_date + timedelta(days=int(days))).strftime('%m-%d') for days in notice_periods}
+        except ValueError as err:
+            self.logger.error(f"Invalid value for notice_period_days: {err}")
+            return []
+        if not target_dates:
+            return []
+        placeholders = ', '.join('?' * len(target_dates))
+        query = f"""
+                SELECT * FROM {self._data_tbl_name}
+                WHERE strftime('%m-%d', {self.date_column}) IN ({placeholders})
+                """
+        return self.perform_query(query, tuple(target_dates), fetch='all', tuple_rows=tuple_rows)
 
-    def _get_upcoming_dates_custom_column(self, date: datetime | None = None):
+    def _get_upcoming_dates_custom_column(self, date: datetime | None = None, tuple_rows: bool = False):
         """
         Fetch users whose birthdays match their 'notice_before' days from the current date.
+        :param tuple_rows: return plain tuples instead of sqlite3.Row objects.
         :return: List of users with matching birthdays.
         """
 
@@ -463,24 +518,22 @@ class TGUserData(DBHandler):
             strftime('%m-%d', DATE(?, '+' || {self.notice_before_days_column} || ' days'))
         """
 
-        return self.perform_query(query, (current_date,), fetch='all')
+        return self.perform_query(query, (current_date,), fetch='all', tuple_rows=tuple_rows)
 
     def get_default_reminders(self, date: datetime | None = None) -> list:
-        default_reminders = []
-        for i in self.default_notice:
-            if row := self._get_upcoming_dates(notice_period_days=i, date=date):
-                default_reminders.extend(rows_to_dict_list(row))
-        return default_reminders
+        return rows_to_dict_list(self._get_upcoming_dates_bulk(self.default_notice, date=date) or [])
 
     def get_custom_reminders(self, date: datetime | None = None) -> list:
         return rows_to_dict_list(self._get_upcoming_dates_custom_column(date))
 
     def get_all_reminders(self, date: datetime | None = None) -> dict:
         all_reminders = {}
-        reminders = self.get_default_reminders(date) + self.get_custom_reminders(date)
+        # plain tuples are enough here, the header is known from the table columns
+        reminders = list(self._get_upcoming_dates_bulk(self.default_notice, date=date, tuple_rows=True) or [])
+        reminders.extend(self._get_upcoming_dates_custom_column(date, tuple_rows=True) or [])
         if reminders:
-            all_reminders["header"] = list(reminders[0].keys())
-            all_reminders['items'] = list(set(tuple(row.values()) for row in reminders))
+            all_reminders["header"] = list(self.column_names)
+            all_reminders['items'] = list(set(reminders))
 
         return all_reminders
 
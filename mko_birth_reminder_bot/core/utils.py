@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, date
 from os import PathLike
 import re
@@ -5,11 +6,15 @@ from typing import Dict, Union, List, Tuple, Optional
 import sqlite3
 import logging
 import uuid
+import hashlib
 from pathlib import Path
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
 DATE_PATTERNS: Tuple[str, ...] = ('%d.%m.%Y', '%Y.%m.%d', '%d-%m-%Y', '%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d')
+TEXT_CLEAN_PATTERN = re.compile(r'[^а-яА-Яa-zA-Z0-9\s\-–]')
+PLACEHOLDER_PATTERN = re.compile(r'\{([a-zA-Z_][a-zA-Z0-9_]*)\}', re.ASCII)
 
 def list_files_in_directory(path: Union[str, PathLike],
                             extensions: Tuple[str, ...] = ('csv', 'txt'),
@@ -66,6 +71,19 @@ def generate_random_filename(extension: str = "csv") -> str:
     """
     return f"{uuid.uuid4().hex}.{extension}"
 
+def file_digest(file: Union[str, PathLike]) -> bytes:
+    """
+    Calculates the digest of the file content.
+
+    Args:
+        file (Union[str, PathLike]): Path to the file.
+
+    Returns:
+        bytes: BLAKE2b digest of the file.
+    """
+    with open(file, 'rb') as f:
+        return hashlib.file_digest(f, 'blake2b').digest()
+
 def generate_date_patterns(date_parts: List[str] = ("%d", "%m", "%Y"),
                            separators: List[str] = ('.', '-', '/')) -> Tuple[str, ...]:
     """
@@ -133,6 +151,29 @@ def parse_date(date_str: str, date_patterns: Tuple[str, ...] = DATE_PATTERNS) ->
             continue
     return None
 
+def parse_date_column(column: pd.Series, date_patterns: Tuple[str, ...] = DATE_PATTERNS) -> pd.Series:
+    """
+    Vectorized version of `parse_date` for a whole column.
+
+    Each pattern is tried in order only on the values not parsed by the previous ones,
+    so the first matching pattern wins, as in `parse_date`.
+
+    Args:
+        column (pd.Series): Column with date strings.
+        date_patterns (Tuple[str, ...]): Tuple of date formats to try.
+
+    Returns:
+        pd.Series: Parsed datetimes, NaT where parsing fails.
+    """
+    values = column.astype(str)
+    parsed = pd.Series(pd.NaT, index=column.index, dtype='datetime64[ns]')
+    for pattern in date_patterns:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=pattern, errors='coerce')
+    return parsed
+
 def clean_text(text: str|int) -> str|int:
     """
     Cleans text by removing unwanted characters and extra spaces.
@@ -146,8 +187,7 @@ def clean_text(text: str|int) -> str|int:
     text = str(text).strip()
     if text.isdigit():
         return int(text)
-    pattern = r'[^а-яА-Яa-zA-Z0-9\s\-–]'
-    return re.sub(pattern, '',text)
+    return TEXT_CLEAN_PATTERN.sub('', text)
 
 
 def safe_substitute(template: str, mapping: Dict[str, str]) -> str:
@@ -164,10 +204,23 @@ def safe_substitute(template: str, mapping: Dict[str, str]) -> str:
     Returns:
         str: The template with placeholders replaced by their corresponding values.
     """
-    pattern = r'\{([a-zA-Z_][a-zA-Z0-9_]*)\}'
-
     def replace_match(match):
         key = match.group(1)
         return str(mapping.get(key, match.group(0)))
 
-    return re.sub(pattern, replace_match, template)
+    return PLACEHOLDER_PATTERN.sub(replace_match, template)
+
+
+def install_uvloop() -> None:
+    """
+    Switches asyncio to the uvloop event loop if it is installed.
+
+    uvloop is an optional dependency (`pip install mko_birth_reminder_bot[speedups]`),
+    it is not available on Windows, where the default loop is used.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("Using uvloop event loop.")
@@ -1,11 +1,10 @@
 import click
 import logging
 import asyncio
-import signal
 from mko_birth_reminder_bot.core.config import PATHS
 from mko_birth_reminder_bot.core.config_utils import save_config, save_message
 from mko_birth_reminder_bot.core import DBHandler, TGUsers
-from mko_birth_reminder_bot.core.utils import list_files_in_directory
+from mko_birth_reminder_bot.core.utils import list_files_in_directory, install_uvloop
 
 # Logging setup
 logger = logging.getLogger(__name__)
@@ -110,6 +109,7 @@ def run_bot() -> None:
     """
     try:
         from mko_birth_reminder_bot.tgbot import run_tg_bot
+        install_uvloop()
         click.echo("Launching the bot... Press Ctrl+C to stop.")
         click.echo("To verify, contact the bot via Telegram using its username (starting with '@') "
                    "and send the '/start' command.")
@@ -123,30 +123,5 @@ def run_bot() -> None:
         click.echo(f"Error launching the bot: {e}", err=True)
 
 
-def handle_signal(signal_number, frame):
-    """
-    Handles SIGINT (Ctrl+C) and SIGTERM (kill).
-
-    This function ensures that the Telegram bot shuts down properly
-    when the process is interrupted or terminated.
-
-    Args:
-        signal_number (int): The received signal number (e.g., SIGINT or SIGTERM).
-        frame (FrameType): The current stack frame (not used).
-    """
-    try:
-        from mko_birth_reminder_bot.tgbot import stop_tg_bot
-        click.echo(f"Received signal {signal_number}. Stopping the bot...")
-        logger.info(f"Received signal {signal_number}. Stopping the bot...")
-        asyncio.create_task(stop_tg_bot())  # Stops the bot asynchronously
-    except Exception as e:
-        logger.exception(f"Error stopping the bot: {e}")
-        click.echo(f"Error stopping the bot: {e}", err=True)
-
-
-# Register signal handlers **before** running CLI
-signal.signal(signal.SIGINT, handle_signal)  # Ctrl+C
-signal.signal(signal.SIGTERM, handle_signal)  # kill
-
 if __name__ == "__main__":
     cli()
@@ -1,7 +1,8 @@
 import logging
+import pandas as pd
 from mko_birth_reminder_bot.core import *
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 
 logger = logging.getLogger(__name__)
 
@@ -45,21 +46,48 @@ class Operator:
         Returns:
             str: A success message or an error message if an exception occurs.
         """
-        try:
+        *_, result = self.import_data_iter(csv_file)
+        return result
+
+    def import_data_iter(self, csv_file: str | Path, chunksize: Optional[int] = None) -> Iterator[str]:
+        """
+        Imports data from a CSV file chunk by chunk, so the file is never read into memory at once.
 
-            df = self.csv_handler.read_csv(csv_file=csv_file)
-            df = self.csv_handler.prepare_dataframe(df)
-            df_count = len(df) # number of rows
-            if self.records_count + df_count > Operator.USERS_LIMIT:
-                return ("Unable to load records due to the maximum record limit being reached."
-                        f"\nThe file contains {df_count} records, and you already have {self.records_count} in the database."
-                        f"\nThe allowed maximum is {Operator.USERS_LIMIT}.")
-            if df_count > 0:
-                self.user_data.add_data(df)
-            return f"Data successfully imported. Number of rows: {df_count}."
+        The prepared chunks are kept until the whole file is read, then written in one transaction.
+        If the file would exceed the record limit, nothing is imported, so at most the limit
+        plus one chunk of rows is held in memory.
+        A progress message is yielded before each following chunk, the last message is the result.
+
+        Args:
+            csv_file (str | Path): Path to the CSV file.
+            chunksize (Optional[int]): Number of rows per chunk, defaults to `CSV.READ_DATA.chunk_size`.
+
+        Yields:
+            str: Progress messages, then a success message or an error message if an exception occurs.
+        """
+        prepared = []
+        df_count = 0  # number of rows
+        try:
+            for df in self.csv_handler.read_csv_chunks(csv_file, chunksize or self.csv_handler.chunk_size):
+                if df_count:
+                    yield f"Read {df_count} rows, loading the next part of the file..."
+                df = self.csv_handler.prepare_dataframe(df)
+                df_count += len(df)
+                if self.records_count + df_count > Operator.USERS_LIMIT:
+                    yield ("Unable to load records due to the maximum record limit being reached."
+                           f"\nThe file contains at least {df_count} records, "
+                           f"and you already have {self.records_count} in the database."
+                           f"\nThe allowed maximum is {Operator.USERS_LIMIT}.")
+                    return
+                if len(df) > 0:
+                    prepared.append(df)
+            if prepared:
+                self.user_data.add_data(pd.concat(prepared, ignore_index=True))
+                self.records_count += df_count
+            yield f"Data successfully imported. Number of rows: {df_count}."
 
         except Exception as e:
-            return f"Unexpected error occurred while importing the file: {str(e)}"
+            yield f"Unexpected error occurred while importing the file: {str(e)}"
 
     def export_data(self) -> str | Path:
         """
@@ -87,6 +115,7 @@ class Operator:
                 return f"Maximum record limit reached: {Operator.USERS_LIMIT}."
 
             self.user_data.add_record(**data)
+            self.records_count = self.user_data.count_records()
             return "Record successfully added."
 
         except Exception as e:
@@ -134,6 +163,7 @@ class Operator:
         """
         try:
             self.user_data.del_record_by_id(record_id=record_id)
+            self.records_count = self.user_data.count_records()
             return "Record was successfully deleted."
         except Exception as e:
             return str(e)
@@ -143,6 +173,7 @@ class Operator:
         Clears all user data from the database.
         """
         self.user_data.flush_data()
+        self.records_count = 0
 
     def del_info(self):
         """
@@ -1,11 +1,23 @@
 import logging
 import asyncio
-from collections import defaultdict
-from time import time
+import signal
+import contextlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from math import inf
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Protocol, TypeVar
+from time import monotonic
+from cachetools import TTLCache
 from telethon import TelegramClient, events, Button
 from telethon.events import StopPropagation
+from telethon.errors import FileReferenceExpiredError, MessageNotModifiedError
 from mko_birth_reminder_bot.reminder import start_scheduler, check_missed_run
 from mko_birth_reminder_bot.core import CONFIG, DB_CONNECTION
+from mko_birth_reminder_bot.core.utils import install_uvloop, file_digest
 from mko_birth_reminder_bot.operator import Operator
 
 logger = logging.getLogger(__name__)
@@ -14,10 +26,193 @@ logger = logging.getLogger(__name__)
 client = None
 bot = None
 bot_id = 0
-user_data = {}  # Dictionary for temporary user data storage
-user_request_times = defaultdict(list)  # {user_id: [timestamps]}
-running = True  # Flag to track bot status
+bot_username = ''  # lower case, the commands of group chats are addressed to it: /start@BotName
+DEFAULT_THROTTLE_LIMIT = (5, 10)  # 5 requests in 10 sec
+
+
+@dataclass(slots=True)
+class UserSession:
+    """Conversation state of a single user."""
+    state: Optional[str] = None
+    waited_param_name: Optional[str] = None
+    params: dict[str, Any] = field(default_factory=dict)
+    last_action: float = 0.0  # monotonic time of the last accepted button press
+    busy: bool = False  # a record is being saved, further presses are rejected
+    export: Optional[tuple[bytes, Any]] = None  # digest and Telegram document of the last CSV export
+
+
+class SessionStore(Protocol):
+    """Storage of the users' conversation state."""
+
+    async def get(self, user_id: int) -> Optional[UserSession]: ...
+
+    async def set(self, user_id: int, session: UserSession) -> None: ...
+
+    async def delete(self, user_id: int) -> None: ...
+
+
+class InMemorySessionStore:
+    """
+    Keeps the sessions in the memory of the bot process.
+
+    At most `maxsize` sessions are stored, a session is evicted after `ttl` seconds
+    without access, reading a session renews its TTL.
+    """
+    __slots__ = ('_sessions',)
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._sessions: TTLCache[int, UserSession] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, user_id: int) -> Optional[UserSession]:
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._sessions[user_id] = session
+        return session
+
+    async def set(self, user_id: int, session: UserSession) -> None:
+        self._sessions[user_id] = session
+
+    async def delete(self, user_id: int) -> None:
+        self._sessions.pop(user_id, None)
+
+
+class ThrottleBackend(Protocol):
+    """Storage of the users' request times for rate limiting."""
+
+    max_period: float  # longest throttle period in seconds
+
+    async def check(self, user_id: int, command: str) -> bool: ...
+
+    def evict(self) -> None: ...
+
+
+class RequestTimes:
+    """Ring buffer of the latest request times of a user, its size does not change after creation."""
+    __slots__ = ('times', 'head')
+
+    def __init__(self, size: int):
+        self.times = array('d', [-inf]) * size
+        self.head = 0  # position of the oldest time, the next one is written there
+
+    def nth_latest(self, n: int) -> float:
+        """Returns the time of the n-th latest request, -inf if there were fewer requests."""
+        return self.times[(self.head - n) % len(self.times)]
+
+    def add(self, time: float) -> None:
+        """Records the request time, overwriting the oldest one."""
+        self.times[self.head] = time
+        self.head = (self.head + 1) % len(self.times)
+
+
+class InMemoryThrottle:
+    """
+    Sliding window rate limiter keeping the request times in the memory of the bot process.
+
+    A request is throttled if the user already made `max_requests` requests within `period`,
+    so only the latest `max_requests` times of the largest limit are kept per user.
+
+    Args:
+        limits (dict): `(max_requests, period)` by command, period is in seconds.
+        default (tuple): Limit of the commands missing in `limits`.
+    """
+    __slots__ = ('limits', 'default', 'max_period', 'size', '_requests')
+
+    def __init__(self, limits: dict[str, list[int]], default: tuple[int, int] = DEFAULT_THROTTLE_LIMIT):
+        self.limits: dict[str, tuple[int, int]] = {command: tuple(limit) for command, limit in limits.items()}
+        self.default = default
+        # timestamps older than the longest period are useless
+        self.max_period = max((period for _, period in self.limits.values()), default=default[1])
+        self.size = max([default[0], *(max_requests for max_requests, _ in self.limits.values())])
+        self._requests: dict[int, RequestTimes] = {}
+
+    async def check(self, user_id: int, command: str) -> bool:
+        now = monotonic()
+
+        max_requests, period = self.limits.get(command, self.default)
+        request_times = self._requests.get(user_id)
+        if request_times is None:
+            request_times = self._requests[user_id] = RequestTimes(self.size)
+
+        if now - request_times.nth_latest(max_requests) < period:
+            return True
+
+        request_times.add(now)
+        return False
+
+    def evict(self) -> None:
+        """Drops the request times of users idle for longer than any throttle period."""
+        now = monotonic()
+        for user_id, request_times in list(self._requests.items()):
+            if now - request_times.nth_latest(1) > self.max_period:
+                del self._requests[user_id]
+
+
+class RateLimiter:
+    """
+    Spaces out the callers evenly, so at most `rate` of them pass per second.
+
+    The waits are scheduled without a lock, the event loop runs the callers one by one.
+    """
+    __slots__ = ('interval', '_next')
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0  # monotonic time at which the next caller may pass
+
+    async def wait(self) -> None:
+        now = monotonic()
+        at = max(self._next, now)
+        self._next = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+# Temporary user data storage
+session_store: SessionStore = InMemorySessionStore(maxsize=CONFIG.TELETHON_API.max_sessions,
+                                                   ttl=CONFIG.TELETHON_API.session_ttl)
+# Operators reused between the events of the same user, see `get_operator`
+operators: TTLCache[int, Operator] = TTLCache(maxsize=CONFIG.TELETHON_API.max_sessions, ttl=CONFIG.TELETHON_API.session_ttl)
+throttle: ThrottleBackend = InMemoryThrottle(CONFIG.TELETHON_API.throttle_limits)
+# Users already told they are throttled, see `first_throttle_notice`
+throttle_notices: TTLCache[tuple[int, str], bool] = TTLCache(maxsize=CONFIG.TELETHON_API.max_sessions,
+                                                             ttl=throttle.max_period)
+# Paces the Telegram requests of all users' handlers, see `paced`
+send_limiter = RateLimiter(CONFIG.TELETHON_API.send_rate)
+# Serializes the handlers of the same user, they read and modify the session across awaits
+user_locks: dict[int, asyncio.Lock] = {}
+lock_users: dict[int, int] = {}  # Number of handlers holding or waiting for each lock, see `lock_for`
+shutdown = asyncio.Event()  # Set once the bot is stopping
+stop_task: Optional[asyncio.Task] = None  # `stop_tg_bot` started by a signal, see `request_stop`
 UNEXPECTED_ERROR_CAPTION = "Unexpected error. Repeat the attempt by entering the /start command."
+SAVING_CAPTION = "Saving..."
+PREVIEW_MAX_LENGTH = 3500  # keeps the record preview below Telegram's 4096 characters message limit
+EVICTION_INTERVAL = 600  # idle users are swept out every 10 min
+UPLOAD_BUFFER_SIZE = 1 << 20  # 1 MiB write buffer for uploaded files
+DOWNLOAD_PART_SIZE_KB = 512  # largest part Telegram serves, 4 times fewer requests than the default for small files
+# Dedicated threads for CSV import/export, so large files can't take over the default executor
+IMPORT_EXECUTOR = ThreadPoolExecutor(max_workers=CONFIG.TELETHON_API.import_workers,
+                                     thread_name_prefix='csv-import')
+
+T = TypeVar('T')
+
+
+async def paced(request: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+    """
+    Sends a Telegram request once the bot-wide `send_limiter` lets it through.
+
+    Every message, edit and callback answer of the handlers goes through here,
+    so the bot as a whole stays under the Telegram limit of about 30 messages per second.
+
+    Args:
+        request: Bound Telethon method, e.g. `event.respond` or `client.send_message`.
+        *args, **kwargs: Arguments of the request.
+
+    Returns:
+        The result of the request.
+    """
+    await send_limiter.wait()
+    return await request(*args, **kwargs)
+
 
 try:
     client = TelegramClient(**CONFIG.TELETHON_API.client)
@@ -26,28 +221,45 @@ except ValueError as error:
                  f"Please ensure the secrets config is filed in and correct.")
 
 
-def get_menu_buttons_list(name:str, config:dict[str:str]) -> list[str]:
+def get_menu_buttons_list(name: str, config: dict[str, list[list[tuple[str, str]]]]) -> list[str]:
     """ Generates Telethon menu buttons list from configuration."""
     level = config.get(name, [])
-    return [button for row in level for item in row for button in item.keys()]
+    return [button for row in level for button, _ in row]
 
 
-def pattern_from_list(buttons:list[str]) -> str:
+def pattern_from_list(buttons: list[str]) -> str:
     """Creates pattern for the Telethon client.on() events filters, from the list of commands"""
     return f"^({'|'.join(buttons)})$"
 
 
-def get_menu_pattern(name, config=CONFIG.TELETHON_API.menu) -> str:
+def get_menu_pattern(name: str, config: dict[str, list[list[tuple[str, str]]]] = CONFIG.TELETHON_API.menu) -> str:
     """Creates pattern for the Telethon client.on() events filters, from the config basing on the name of the menu"""
     buttons = get_menu_buttons_list(name, config)
     return pattern_from_list(buttons)
 
 
+def matcher_from_list(buttons: list[str]) -> Callable[[bytes], bool]:
+    """
+    Creates a callback data matcher for the Telethon CallbackQuery filters, from the list of commands.
+
+    Checks the raw payload against a set of the encoded commands, instead of matching the regex
+    of `pattern_from_list` on every callback.
+    """
+    return frozenset(button.encode('UTF-8') for button in buttons).__contains__
+
+
+def get_menu_matcher(name: str,
+                     config: dict[str, list[list[tuple[str, str]]]] = CONFIG.TELETHON_API.menu) -> Callable[[bytes], bool]:
+    """Creates callback data matcher for the Telethon client.on() events filters from the menu config"""
+    return matcher_from_list(get_menu_buttons_list(name, config))
+
+
 async def handle_waited_param(event, user_id):
     """Handles user input when adding, updating a new record."""
-    waited_param_name = user_data[user_id].pop("waited_param_name", None)
+    session = await get_session(user_id)
+    waited_param_name, session.waited_param_name = session.waited_param_name, None
     if waited_param_name:
-        user_data[user_id]["params"][waited_param_name] = event.raw_text
+        session.params[waited_param_name] = event.raw_text
         await show_record_menu(event, user_id)
 
 
@@ -56,21 +268,29 @@ async def handle_confirm_data(event, user_id):
     is_valid = await validate_record(event, user_id)
     if not is_valid:
         return
-    operator: Operator = Operator(user_id)
-    state = user_data[user_id].get("state")
+    session = await get_session(user_id)
+    session.busy = True
+    # busy is cleared whatever fails, otherwise every further press of the user is rejected
     try:
-        if state == "add_record":
-            caption = await asyncio.to_thread(operator.add_record, **user_data[user_id]["params"])
-        elif state == "update_record_by_id":
-            caption = await asyncio.to_thread(operator.update_record_by_id, **user_data[user_id]["params"])
-        else:
-            logger.error(f"Unexpected state: {state}")
+        # acknowledge at once, the message is edited with the result when the database write is done
+        ack = await paced(client.send_message, user_id, SAVING_CAPTION)
+        operator: Operator = await get_operator(user_id)
+        state = session.state
+        try:
+            if state == "add_record":
+                caption = await asyncio.to_thread(operator.add_record, **session.params)
+            elif state == "update_record_by_id":
+                caption = await asyncio.to_thread(operator.update_record_by_id, **session.params)
+            else:
+                logger.error(f"Unexpected state: {state}")
+                caption = UNEXPECTED_ERROR_CAPTION
+        except Exception as e:
+            logger.error(f"Error in state: {state}, while processing record. {e}")
             caption = UNEXPECTED_ERROR_CAPTION
-    except Exception as e:
-        logger.error(f"Error in state: {state}, while processing record. {e}")
-        caption = UNEXPECTED_ERROR_CAPTION
+    finally:
+        session.busy = False
 
-    await client.send_message(user_id, caption)
+    await paced(ack.edit, caption)
     await show_start_menu(event, user_id, rewrite=False)
 
 
@@ -79,28 +299,44 @@ async def handle_delete_record(event, user_id):
     record_id = event.raw_text.strip()
 
     if not record_id.isdigit():
-        await event.respond("⚠️ Invalid ID format. Please enter a valid number.")
+        await paced(event.respond, "⚠️ Invalid ID format. Please enter a valid number.")
         return
 
-    operator: Operator = Operator(user_id)
+    ack = await paced(client.send_message, event.chat_id, SAVING_CAPTION)
+    operator: Operator = await get_operator(user_id)
     caption = await asyncio.to_thread(operator.delete_record_by_id, record_id)
-    await client.send_message(event.chat_id, caption)
+    await paced(ack.edit, caption)
     await show_start_menu(event, user_id, rewrite=False)
 
 
 async def handle_import_csv(event, user_id):
     """Handles CSV file import."""
     response = await save_csv_file(event, user_id)
-    msg = await event.respond(response)
+    msg = await paced(event.respond, response)
 
-    file = user_data[user_id]["params"].get("csv")
+    session = await get_session(user_id)
+    file = session.params.get("csv")
     if not file:
-        await msg.respond("⚠️ No file found. Please upload a CSV file.")
+        await paced(msg.respond, "⚠️ No file found. Please upload a CSV file.")
         return
+    logger.debug("CSV import path: %s", file)
 
-    operator: Operator = Operator(user_id)
-    text = await asyncio.to_thread(operator.import_data, file)
-    await msg.respond(text)
+    try:
+        operator: Operator = await get_operator(user_id)
+        loop = asyncio.get_running_loop()
+        # each chunk is processed in the executor, progress is reported between the chunks
+        # by editing a single status message, which ends up with the result of the import
+        statuses = operator.import_data_iter(file)
+        status = None
+        while (text := await loop.run_in_executor(IMPORT_EXECUTOR, next, statuses, None)) is not None:
+            if status is None:
+                status = await paced(msg.respond, text)
+            else:
+                await paced(status.edit, text)
+    finally:
+        # the upload is only needed for the import, it is not left for the `cleanup_tmp` sweep
+        Path(file).unlink(missing_ok=True)
+        session.params['csv'] = None
     await show_start_menu(event, user_id, rewrite=False)
 
 
@@ -108,7 +344,11 @@ async def save_csv_file(event, user_id: int, upload_dir: str = CONFIG.CSV.READ_D
     """
     Saves a user-uploaded CSV file to the specified directory.
 
-    The file path is stored in `user_data[user_id]['params']['csv']`.
+    Uploads that are not CSV or exceed `max_upload_bytes` are rejected before downloading.
+    The file is streamed into a 1 MiB buffered writer of a new temporary file in `upload_dir`,
+    the file path is stored in `session.params['csv']`.
+    The local writes are synchronous on purpose, do not switch them to aiofiles: the buffered
+    writes are cheap compared to the download, handing each of them to a thread pool is slower.
 
     Args:
         event (telethon.events.NewMessage.Event): The event triggered by the user's file upload.
@@ -120,18 +360,30 @@ async def save_csv_file(event, user_id: int, upload_dir: str = CONFIG.CSV.READ_D
         str: A message indicating success or an error.
     """
 
-    user_data[user_id]['params']['csv'] = None
+    session = await get_session(user_id)
+    session.params['csv'] = None
 
-    if event.file and event.file.mime_type == "text/csv":
-        try:
-            # Save the file
-            user_data[user_id]['params']['csv'] = await event.download_media(file=upload_dir)
-            return "File successfully saved. Proceeding with data loading."
-        except Exception as e:
-            logger.error(f"Error saving file: {e}")
-            return f"Error saving file: {e}"
-    else:
+    # the file is checked before downloading, so wrong or oversized uploads cost no traffic
+    if not event.file or event.file.mime_type != "text/csv":
         return "Error: Please upload a CSV file."
+    max_size = CONFIG.CSV.READ_DATA.max_upload_bytes
+    if event.file.size and event.file.size > max_size:
+        return f"Error: The file is too large (more than {max_size // 1024 // 1024} MiB)."
+
+    file = None
+    try:
+        # Save the file, the name is created exclusively, so concurrent uploads never collide
+        with tempfile.NamedTemporaryFile(dir=upload_dir, prefix=f"{user_id}_", suffix='.csv',
+                                         delete=False, buffering=UPLOAD_BUFFER_SIZE) as f:
+            file = Path(f.name)
+            await client.download_file(event.message.media, f, part_size_kb=DOWNLOAD_PART_SIZE_KB)
+        session.params['csv'] = file
+        return "File successfully saved. Proceeding with data loading."
+    except Exception as e:
+        logger.error(f"Error saving file: {e}")
+        if file:
+            file.unlink(missing_ok=True)
+        return f"Error saving file: {e}"
 
 
 # General functions
@@ -150,49 +402,67 @@ def make_menu(name, config) -> list[list[Button]] | None:
         return None
 
     level = config[name]
-    return [
-        [Button.inline(text, button.encode('UTF-8')) for item in row for button, text in item.items()]
-        for row in level
-    ]
+    return [[Button.inline(text, button.encode('UTF-8')) for button, text in row] for row in level]
+
+
+# Menus are built once, the configuration does not change at runtime
+MENUS: dict[str, list[list[Button]]] = {name: make_menu(name, CONFIG.TELETHON_API.menu)
+                                        for name in CONFIG.TELETHON_API.menu}
 
 
 def get_prompt_from_config(choice, menu):
     """
-    Recursively searches for a key in a nested dictionary or list structure.
+    Searches for a button key in the menu configuration.
 
     Parameters:
     ----------
     choice : str
         The key to search for.
-    menu : dict or list
-        The nested structure (dictionary or list) to search within.
+    menu : dict
+        The menu configuration, rows of `(button, text)` pairs by menu name.
 
     Returns:
     -------
-    Any
-        The value associated with the specified key, or None if not found.
-    """
-    # Base case: if the key exists at the current level of the dictionary
-    if isinstance(menu, dict):
-        if choice in menu:
-            return menu[choice]
-        # Recursively search in values of the dictionary
-        for value in menu.values():
-            result = get_prompt_from_config(choice, value)
-            if result is not None:
-                return result
-
-    # If the current level is a list, iterate through its elements
-    elif isinstance(menu, list):
-        for item in menu:
-            result = get_prompt_from_config(choice, item)
-            if result is not None:
-                return result
-
-    # If no match is found, return None
+    str or None
+        The text of the first button with the specified key, or None if not found.
+    """
+    for level in menu.values():
+        for row in level:
+            for button, text in row:
+                if button == choice:
+                    return text
     return None
 
 
+def flatten_prompts(menu) -> dict[str, str]:
+    """
+    Collects all `(button, text)` pairs of the menu configuration into a flat dictionary.
+
+    Walks the menus in the same order as `get_prompt_from_config`, so the first match wins.
+
+    Parameters:
+    ----------
+    menu : dict
+        The menu configuration, rows of `(button, text)` pairs by menu name.
+
+    Returns:
+    -------
+    dict[str, str]
+        Mapping of the button key to its text.
+    """
+    prompts = {}
+    for level in menu.values():
+        for row in level:
+            for button, text in row:
+                prompts.setdefault(button, text)
+    return prompts
+
+
+PROMPTS: dict[str, str] = flatten_prompts(CONFIG.TELETHON_API.menu)
+# Callback payloads encoded once, maps `event.data` to the button key without decoding it on every event
+CALLBACKS: dict[bytes, str] = {key.encode('UTF-8'): key for key in PROMPTS}
+
+
 async def get_event_message(event):
     """
     Safely retrieves the message associated with the event.
@@ -214,7 +484,10 @@ async def handle_edit_respond(event, text=None, buttons=None, rewrite=True):
     Sends or edits a message dynamically.
 
     If `rewrite` is True and the original message was sent by the bot, it attempts to edit it.
+    Inline buttons are only attached to the bot's messages, so for callback queries the message
+    is edited by its ID without fetching it first.
     If editing fails or `remove_old_buttons` is True, sends a new message.
+    A message that already shows the same text and buttons is left as is.
 
     Args:
         event (telethon.events.NewMessage.Event or telethon.events.CallbackQuery.Event):
@@ -224,38 +497,88 @@ async def handle_edit_respond(event, text=None, buttons=None, rewrite=True):
         rewrite (bool, optional): If True, attempts to edit the existing message. Defaults to True.
 
     Returns:
-        telethon.tl.custom.message.Message: The sent or edited message object.
+        telethon.tl.custom.message.Message or None: The sent or edited message object,
+            None if the message was not modified.
     """
-    # Get bot information once per function call
-    message = await get_event_message(event)  # Safe message retrieval
-
-    if rewrite and message and message.sender_id == bot_id:
+    if rewrite:
         try:
-            return await message.edit(text=text, buttons=buttons)
+            if isinstance(event, events.CallbackQuery.Event):
+                return await paced(event.edit, text, buttons=buttons)
+            message = await get_event_message(event)  # Safe message retrieval
+            if message and message.sender_id == bot_id:
+                return await paced(message.edit, text=text, buttons=buttons)
+        except MessageNotModifiedError:
+            return None  # e.g. the same button pressed twice, a new message would duplicate it
         except Exception as e:
             logger.warning(f"Editing failed, sending new message: {e}")
 
-    return await event.respond(text, buttons=buttons)
+    return await paced(event.respond, text, buttons=buttons)
 
 
-async def init_user(user_id):
+async def init_user(user_id) -> UserSession:
     """Initializes user data."""
-    user_data[user_id] = {'state': None, 'params': {}}
+    session = UserSession()
+    await session_store.set(user_id, session)
+    return session
+
+
+async def get_session(user_id) -> UserSession:
+    """Returns user data, initializing it if the user is new or the session has expired."""
+    session = await session_store.get(user_id)
+    if session is None:
+        session = await init_user(user_id)
+    return session
+
+
+@contextlib.asynccontextmanager
+async def lock_for(user_id):
+    """
+    Holds the lock of the user, creating it on first use.
+
+    The handlers holding or waiting for the lock are counted, the lock is dropped
+    once the last of them releases it.
+    """
+    lock = user_locks.get(user_id)
+    if lock is None:
+        lock = user_locks[user_id] = asyncio.Lock()
+    lock_users[user_id] = lock_users.get(user_id, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        lock_users[user_id] -= 1
+        if not lock_users[user_id]:
+            del lock_users[user_id], user_locks[user_id]
+
+
+async def get_operator(user_id) -> Operator:
+    """
+    Returns the cached Operator of the user.
+
+    On a cache miss the Operator is created in a worker thread,
+    as its initialization queries the database.
+    """
+    operator = operators.get(user_id)
+    if operator is None:
+        operator = await asyncio.to_thread(Operator, user_id)
+        operators[user_id] = operator
+    return operator
 
 
 async def drop_user_state(user_id):
     """Resets the user's state."""
-    if user_id in user_data:
-        user_data[user_id]['state'] = None
-        user_data[user_id].pop('waited_param_name', None)
-        user_data[user_id]['params'] = {}
+    session = await session_store.get(user_id)
+    if session is not None:
+        session.state = None
+        session.waited_param_name = None
+        session.params = {}
 
 
 async def ask_for_input(event, user_id, param_name, prompt_text):
     """
     Requests user input for a specific parameter.
 
-    The requested parameter is stored in `user_data[user_id]['waited_param_name']`.
+    The requested parameter is stored in `session.waited_param_name`.
 
     Args:
         event (telethon.events.NewMessage.Event or telethon.events.CallbackQuery.Event or telethon.tl.custom.message.Message):
@@ -267,11 +590,12 @@ async def ask_for_input(event, user_id, param_name, prompt_text):
     Returns:
         None
     """
-    if user_id not in user_data:
+    session = await session_store.get(user_id)
+    if session is None:
         logger.error(f"User ID {user_id} not found while requesting input.")
         prompt_text = UNEXPECTED_ERROR_CAPTION
-
-    user_data[user_id]['waited_param_name'] = param_name  # Store the expected parameter
+    else:
+        session.waited_param_name = param_name  # Store the expected parameter
     await handle_edit_respond(event, prompt_text)
 
 
@@ -289,7 +613,7 @@ async def show_start_menu(event, user_id: int, rewrite: bool = True):
         None
     """
     await drop_user_state(user_id)
-    menu = make_menu("start", CONFIG.TELETHON_API.menu)
+    menu = MENUS.get("start")
     if menu:
         await handle_edit_respond(event, "Select an option:", buttons=menu, rewrite=rewrite)
     else:
@@ -310,7 +634,7 @@ async def show_record_menu(event, rewrite: bool = True):
     Raises:
         ValueError: If the add record menu is not found in the configuration.
     """
-    menu = make_menu("add_record", CONFIG.TELETHON_API.menu)
+    menu = MENUS.get("add_record")
     if menu:
         await handle_edit_respond(event, "Select a field to enter data:", buttons=menu, rewrite=rewrite)
     else:
@@ -334,14 +658,17 @@ async def validate_record(event, user_id) -> bool:
     Returns:
         bool: True if the record is complete, False if additional input is required.
     """
-    user_info = user_data[user_id].get('params', {})
+    session = await get_session(user_id)
+    user_info = session.params
 
-    if 'birth_date' in user_info or user_data[user_id]['state'] == 'update_record_by_id':
-        result = "\n".join(f"{key}: {value}" for key, value in user_info.items())
+    if 'birth_date' in user_info or session.state == 'update_record_by_id':
+        result = "\n".join([f"{key}: {value}" for key, value in user_info.items()])
+        if len(result) > PREVIEW_MAX_LENGTH:
+            result = result[:PREVIEW_MAX_LENGTH] + "\n...(truncated)"
         await handle_edit_respond(event, text=f"Entered data:\n{result}", rewrite=True)
         return True
     else:
-        prompt = f"You did not fill in the required field: {get_prompt_from_config('birth_date', CONFIG.TELETHON_API.menu)}"
+        prompt = f"You did not fill in the required field: {PROMPTS.get('birth_date')}"
         await handle_edit_respond(event, text=prompt, rewrite=True)
         await show_record_menu(event, rewrite=False)
         return False
@@ -357,19 +684,33 @@ async def is_throttled(user_id: int, command: str) -> bool:
     Returns:
         bool: True if throttled, False otherwise.
     """
-    now = time()
+    return await throttle.check(user_id, command)
 
-    max_requests, period = CONFIG.TELETHON_API.throttle_limits.get(command, (5, 10))  # Default: 5 in 10 sec
-    request_times = user_request_times[user_id]
 
-    # Remove outdated requests
-    user_request_times[user_id] = [t for t in request_times if now - t < period]
+def first_throttle_notice(user_id: int, command: str) -> bool:
+    """
+    Returns True for the first throttled request of the user within the throttle period.
+
+    Only that request gets the "Too many actions" notice. The notice is sent without `paced`,
+    so a flooding user cannot book the send slots of the other users.
+    """
+    if (user_id, command) in throttle_notices:
+        return False
+    throttle_notices[user_id, command] = True
+    return True
 
-    if len(user_request_times[user_id]) >= max_requests:
-        return True
 
-    user_request_times[user_id].append(now)
-    return False
+def evict_idle_users() -> None:
+    """Drops throttle state of idle users and expired operators, user locks are dropped by `lock_for`."""
+    throttle.evict()
+    operators.expire()
+
+
+async def run_eviction():
+    """Periodically evicts the data of idle users while the bot is running."""
+    while not shutdown.is_set():
+        await asyncio.sleep(EVICTION_INTERVAL)
+        evict_idle_users()
 
 
 async def request_id(event, user_id):
@@ -393,19 +734,38 @@ async def request_csv(event, user_id):
 
 
 async def handle_export_csv(event, user_id):
-    """Handles CSV export."""
-    operator: Operator = Operator(user_id)
-    file = await asyncio.to_thread(operator.export_data)
-    if file:
-        await client.send_file(event.chat_id, file, caption="Here is your data file in CSV format.")
-        await asyncio.to_thread(operator.remove_tmp_file, file)
-    else:
-        await client.send_message(user_id, "Failed to export the file. Please contact the developers for assistance.")
+    """
+    Handles CSV export.
+
+    If the exported file is the same as the previous export of the user,
+    the document already stored by Telegram is sent again instead of uploading the file.
+    """
+    operator: Operator = await get_operator(user_id)
+    loop = asyncio.get_running_loop()
+    file = await loop.run_in_executor(IMPORT_EXECUTOR, operator.export_data)
+    if not file:
+        await paced(client.send_message, user_id,
+                    "Failed to export the file. Please contact the developers for assistance.")
+        return
+
+    caption = "Here is your data file in CSV format."
+    digest = await loop.run_in_executor(IMPORT_EXECUTOR, file_digest, file)
+    session = await get_session(user_id)
+    message = None
+    if session.export and session.export[0] == digest:
+        try:
+            message = await paced(client.send_file, event.chat_id, session.export[1], caption=caption)
+        except FileReferenceExpiredError:
+            logger.debug(f"Expired file reference of the export of user {user_id}, uploading the file.")
+    if message is None:
+        message = await paced(client.send_file, event.chat_id, file, caption=caption)
+    session.export = (digest, message.document)
+    await asyncio.to_thread(operator.remove_tmp_file, file)
 
 
 async def delete_all_records(event, user_id):
     """Handles deleting all user records."""
-    operator: Operator = Operator(user_id)
+    operator: Operator = await get_operator(user_id)
     await asyncio.to_thread(operator.flush_data)
     await handle_edit_respond(event, text="All your data has been deleted.", rewrite=True)
     await show_start_menu(event, user_id, rewrite=False)
@@ -413,8 +773,10 @@ async def delete_all_records(event, user_id):
 
 async def delete_user(event, user_id):
     """Handles deleting all user records."""
-    operator: Operator = Operator(user_id)
+    operator: Operator = await get_operator(user_id)
     await asyncio.to_thread(operator.del_info)
+    await session_store.delete(user_id)
+    operators.pop(user_id, None)
     await handle_edit_respond(
         event=event,
         text="All your data has been deleted, "
@@ -426,12 +788,31 @@ async def delete_user(event, user_id):
 async def default_handler(event, user_id):
     """Handles unexpected states."""
     logger.warning(f"Unexpected state for user {user_id}")
-    await event.respond("⚠️ Please read /help and use /start command to get the main menu.")
+    await paced(event.respond, "⚠️ Please read /help and use /start command to get the main menu.")
     # await show_start_menu(event, user_id, rewrite=False)
 
 
-# noinspection PyTypeChecker
-@client.on(events.NewMessage)
+# Start menu callback handlers, each is called with (event, user_id)
+START_MENU_HANDLERS: dict[str, Callable[[Any, int], Awaitable[None]]] = {
+    "add_record": lambda event, user_id: show_record_menu(event),
+    "update_record_by_id": request_id,
+    "delete_record_by_id": request_id,
+    "import_csv": request_csv,
+    "export_csv": handle_export_csv,
+    "delete_all_records": delete_all_records,
+    "delete_user": delete_user,
+}
+
+
+# Text input handlers by the user state, each is called with (event, user_id)
+TEXT_HANDLERS: dict[str, Callable[[Any, int], Awaitable[None]]] = {
+    "add_record": handle_waited_param,
+    "update_record_by_id": handle_waited_param,
+    "delete_record_by_id": handle_delete_record,
+    "import_csv": handle_import_csv,
+}
+
+
 async def throttle_filter_text(event):
     """
     Throttle filter for all incoming messages.
@@ -445,12 +826,11 @@ async def throttle_filter_text(event):
     user_id = event.sender_id
     #  Throttling (antispam)
     if await is_throttled(user_id, "text"):
-        await event.respond("⏳ Too many actions! Please wait a moment.")
+        if first_throttle_notice(user_id, "text"):
+            await event.respond("⏳ Too many actions! Please wait a moment.")
         raise StopPropagation
 
 
-# noinspection PyTypeChecker
-@client.on(events.CallbackQuery)
 async def throttle_filter_callback(event):
     """
     Throttle filter for all CallbackQuery events.
@@ -465,13 +845,46 @@ async def throttle_filter_callback(event):
 
     #  Throttling (antispam)
     if await is_throttled(user_id, "callback"):
-        await event.answer("⏳ Too many actions! Please wait a moment.", alert=True)
+        if first_throttle_notice(user_id, "callback"):
+            await event.answer("⏳ Too many actions! Please wait a moment.", alert=True)
+        raise StopPropagation
+
+    # Debouncing, repeated taps are acknowledged without running the handlers;
+    # a user without a session has no previous action, no session is created for a stale button here
+    session = await session_store.get(user_id)
+    if session is None:
+        return
+    now = monotonic()
+    if session.busy or now - session.last_action < CONFIG.TELETHON_API.debounce_interval:
+        await paced(event.answer, "⏳ Still processing the previous action.")
         raise StopPropagation
+    session.last_action = now
+
+
+def throttled(event_filter: Callable[[Any], Awaitable[None]]):
+    """
+    Runs the throttle filter before the decorated handler.
+
+    The filter is applied inside the handler instead of being registered as a handler of its own,
+    so Telethon dispatches each event once.
+
+    Args:
+        event_filter: `throttle_filter_text` or `throttle_filter_callback`,
+            raises StopPropagation if the event must not be handled.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(event):
+            await event_filter(event)
+            return await handler(event)
+        return wrapper
+    return decorator
 
 
 # noinspection PyTypeChecker
 @client.on(events.CallbackQuery(
-    pattern=get_menu_pattern('start')))
+    pattern=get_menu_matcher('start')))
+@throttled(throttle_filter_callback)
 async def handle_start_menu_callback(event):
     """
     Handles start menu button clicks in the Telegram bot menu.
@@ -485,34 +898,23 @@ async def handle_start_menu_callback(event):
 
     user_id = event.sender_id
 
-    if user_id not in user_data:
-        await init_user(user_id)
-
-    callback = event.data.decode("utf-8")
-
-    # keeping state for the user
-    user_data[user_id]['state'] = callback
-
-    match callback:
-        case "add_record":
-            await show_record_menu(event, user_id)
-        case "update_record_by_id":
-            await request_id(event, user_id)
-        case "delete_record_by_id":
-            await request_id(event, user_id)
-        case "import_csv":
-            await request_csv(event, user_id)
-        case "export_csv":
-            await handle_export_csv(event, user_id)
-        case "delete_all_records":
-            await delete_all_records(event, user_id)
-        case "delete_user":
-            await delete_user(event, user_id)
-        case _:
-            logger.error(f"Unexpected callback: {callback}")
+    async with lock_for(user_id):
+        session = await get_session(user_id)
+
+        callback = CALLBACKS.get(event.data)
+
+        # keeping state for the user
+        session.state = callback
+
+        handler = START_MENU_HANDLERS.get(callback)
+        if handler:
+            await handler(event, user_id)
+        else:
+            logger.error(f"Unexpected callback: {event.data}")
     raise StopPropagation
 
 @client.on(events.CallbackQuery(data=b"back_to_start"))
+@throttled(throttle_filter_callback)
 async def handle_confirm_data_callback(event):
     """
     Handles back_to_start button clicks in the Telegram bot menu, returns to start menu.
@@ -527,6 +929,7 @@ async def handle_confirm_data_callback(event):
     raise StopPropagation
 
 @client.on(events.CallbackQuery(data=b"confirm_data"))
+@throttled(throttle_filter_callback)
 async def handle_confirm_data_callback(event):
     """
     Handles confirm_data button clicks in the Telegram bot menu.
@@ -537,11 +940,13 @@ async def handle_confirm_data_callback(event):
         None
     """
     user_id = event.sender_id
-    await handle_confirm_data(event, user_id)
+    async with lock_for(user_id):
+        await handle_confirm_data(event, user_id)
     raise StopPropagation
 
 
 @client.on(events.CallbackQuery(data=b"birth_date"))
+@throttled(throttle_filter_callback)
 async def handle_birth_day_callback(event):
     """
     Handles birth_date button clicks in the Telegram bot menu.
@@ -551,9 +956,9 @@ async def handle_birth_day_callback(event):
     Returns:
         None
     """
-    choice = event.data.decode("utf-8")
+    choice = CALLBACKS.get(event.data)
     user_id = event.sender_id
-    prompt = get_prompt_from_config(choice, CONFIG.TELETHON_API.menu)
+    prompt = PROMPTS.get(choice)
     prompt = f"Send me {prompt}"
     prompt += "\nFormat: dd/mm/yyyy (e.g. 01/03/2000)"
     await ask_for_input(event, user_id, "birth_date", prompt)
@@ -562,10 +967,11 @@ async def handle_birth_day_callback(event):
 
 @client.on(
     events.CallbackQuery(
-        pattern=pattern_from_list(
+        pattern=matcher_from_list(
             ["company", "position", "gift_category",
              "first_name", "last_name", "notice_before_days"]
         )))
+@throttled(throttle_filter_callback)
 async def handle_record_menu_callback(event):
     """
     Handles record fields entry button clicks in the Telegram bot menu.
@@ -576,14 +982,13 @@ async def handle_record_menu_callback(event):
         None
     """
     user_id = event.sender_id
-    choice = event.data.decode("utf-8")
-    prompt = get_prompt_from_config(choice, CONFIG.TELETHON_API.menu)
+    choice = CALLBACKS.get(event.data)
+    prompt = PROMPTS.get(choice)
     prompt = f"Send me {prompt}"
     await ask_for_input(event, user_id, choice, prompt)
     raise StopPropagation
 
 
-@client.on(events.NewMessage(pattern="/start"))
 async def start(event):
     """Handles the /start command and shows the main menu.
 
@@ -597,17 +1002,13 @@ async def start(event):
 
     await init_user(user_id)
     await show_start_menu(event, user_id)
-    raise StopPropagation
 
 
-@client.on(events.NewMessage(pattern="/help"))
 async def help_command(event):
     """Handles the /help command and sends the help message."""
-    await event.respond(CONFIG.MSG.help)
-    raise StopPropagation
+    await paced(event.respond, CONFIG.MSG.help)
 
 
-@client.on(events.NewMessage())
 async def handle_text(event):
     """
     Handles user text input at all menu levels.
@@ -622,20 +1023,44 @@ async def handle_text(event):
 
     user_id = event.sender_id
 
-    if user_id not in user_data:
-        await init_user(user_id)
-
-    match user_data[user_id]['state']:
-        case "add_record":
-            await handle_waited_param(event=event, user_id=user_id)
-        case "update_record_by_id":
-            await handle_waited_param(event=event, user_id=user_id)
-        case "delete_record_by_id":
-            await handle_delete_record(event=event, user_id=user_id)
-        case "import_csv":
-            await handle_import_csv(event=event, user_id=user_id)
-        case _:
-            await default_handler(event=event, user_id=user_id)
+    # users without a session have no state to continue, no session or lock is created for them
+    if await session_store.get(user_id) is None:
+        await default_handler(event, user_id)
+        return
+
+    async with lock_for(user_id):
+        session = await get_session(user_id)
+        handler = TEXT_HANDLERS.get(session.state, default_handler)
+        await handler(event, user_id)
+
+
+# Bot commands by the first word of the message, anything else is handled by `handle_text`
+COMMANDS: dict[str, Callable[[Any], Awaitable[None]]] = {
+    "/start": start,
+    "/help": help_command,
+}
+
+
+# noinspection PyTypeChecker
+@client.on(events.NewMessage)
+@throttled(throttle_filter_text)
+async def on_message(event):
+    """
+    Routes all incoming messages, so each of them is dispatched by Telethon only once.
+
+    Args:
+        event (telethon.events.NewMessage.Event): The incoming event.
+
+    Returns:
+        None
+    """
+    words = event.raw_text.split(maxsplit=1)
+    command, _, addressee = words[0].partition('@') if words else ('', '', '')
+    if command.startswith('/') and addressee and addressee.lower() != bot_username:
+        return  # a command for another bot of the group chat
+    handler = COMMANDS.get(command)
+    await (handler or handle_text)(event)
+
 
 async def run_tg_bot():
     """
@@ -643,25 +1068,54 @@ async def run_tg_bot():
 
     This function initializes and runs the Telegram bot using the Telethon library.
     It also starts the scheduled tasks associated with the bot. The function keeps running
-    until the global `running` flag is set to False.
+    until the client is disconnected by `stop_tg_bot` or the task is cancelled.
     """
-    global running, bot, bot_id
+    global bot, bot_id, bot_username
     await client.start(bot_token=CONFIG.TELETHON_API.bot_token)
     bot = await client.get_me()
     bot_id = bot.id
+    bot_username = (bot.username or '').lower()
     logger.info("Telegram bot is running.")
     # Start scheduler
     await start_scheduler(client)
     await check_missed_run(client)
+    eviction = asyncio.create_task(run_eviction())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):  # not supported by the Windows event loops
+            loop.add_signal_handler(sig, request_stop)
 
     try:
-        while running:
-            await asyncio.sleep(1)  # Keeps the bot running
+        await client.run_until_disconnected()  # Keeps the bot running
     except asyncio.CancelledError:
         pass  # Allows graceful exit if cancelled externally
+    finally:
+        eviction.cancel()
 
-    # Shutdown process
-    await stop_tg_bot()
+    # Shutdown process, waits for the one started by a signal to finish closing the database
+    await (stop_task or stop_tg_bot())
+
+
+def request_stop() -> None:
+    """
+    Handles SIGINT and SIGTERM inside the event loop.
+
+    Starts `stop_tg_bot` once, the disconnect then ends `run_tg_bot`.
+    """
+    global stop_task
+    if stop_task is None:
+        logger.info("Stop signal received. Stopping the bot...")
+        stop_task = asyncio.get_running_loop().create_task(stop_tg_bot())
+
+
+def close_database() -> None:
+    """
+    Commits and closes the database connection.
+
+    Closing the last connection also checkpoints the WAL into the database file.
+    """
+    DB_CONNECTION.commit()
+    DB_CONNECTION.close()
 
 
 async def stop_tg_bot():
@@ -669,22 +1123,25 @@ async def stop_tg_bot():
     Gracefully stops the Telegram bot and its scheduler.
 
     This function stops the bot, commits and closes the database connection,
-    and ensures a clean shutdown.
+    and ensures a clean shutdown. Calls after the first one do nothing.
     """
-    global running
-    running = False
+    if shutdown.is_set():
+        return
+    shutdown.set()
 
     try:
         if DB_CONNECTION:
-            DB_CONNECTION.commit()
-            DB_CONNECTION.close()
+            # commit and close may wait for the disk, they must not hold up the disconnect
+            await asyncio.to_thread(close_database)
             logger.info("Database connection closed.")
     except Exception as e:
         logger.error(f"Error closing the database: {e}")
 
+    IMPORT_EXECUTOR.shutdown(wait=False, cancel_futures=True)
     await client.disconnect()
     logger.info("Telegram bot has been stopped.")
 
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(run_tg_bot())
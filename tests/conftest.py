@@ -1,14 +1,38 @@
+import os
+import hashlib
+import contextlib
 import pytest
 import pytest_asyncio
 import random
 from pathlib import Path
-from mko_birth_reminder_bot.core import CSVHandler, TGUser, TGUserData, CONFIG
+from mko_birth_reminder_bot.core import CSVHandler, TGUser, TGUserData, TGUsers, DBHandler, CONFIG
+from mko_birth_reminder_bot.core import db_handler
 from mko_birth_reminder_bot.quotes import QuoteFetcher
+from mko_birth_reminder_bot.operator import Operator
 import faker
+import numpy as np
 import pandas as pd
 from typing import List, Dict
 from .test_data import TestData
 
+# every pytest-xdist worker writes its own test CSV, so the cleanup of one worker never removes the file of another
+TEST_CSV_NAME = f"test_data_{os.environ.get('PYTEST_XDIST_WORKER', 'master')}.csv"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def in_memory_db():
+    """
+    Routes all database handlers to a fresh in-memory SQLite database
+    instead of the on-disk one from the config.
+    """
+    db_con = db_handler.sqlite_connect(":memory:")
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setattr(db_handler, "DB_CONNECTION", db_con)
+    with DBHandler() as tmp_db_handler:
+        tmp_db_handler.create_table(TGUsers.TABLE_NAME, TGUsers.TABLE_FIELDS)
+    yield db_con
+    monkeypatch.undo()
+    db_con.close()
 
 
 @pytest.fixture(scope="class")
@@ -16,8 +40,14 @@ def config():
     return CONFIG
 
 @pytest.fixture(scope="module")
-def random_user_id()->int:
-    return random.randrange(10 ** 11, 10 ** 12)
+def random_user_id(request) -> int:
+    """
+    Returns test user id unique for the pytest-xdist worker and the test module,
+    so the `id_<tg_user_id>` tables never collide when running `pytest -n auto`.
+    """
+    seed = os.environ.get("PYTEST_XDIST_WORKER", "master") + request.node.nodeid
+    digest = int(hashlib.blake2b(seed.encode(), digest_size=8).hexdigest(), 16)
+    return 10 ** 11 + digest % (9 * 10 ** 11)
 
 def get_test_data(num_records: int = 1, valid = True) -> list:
     """
@@ -34,61 +64,89 @@ def get_test_data(num_records: int = 1, valid = True) -> list:
 
     return data if num_records == 0 else random.sample(data, num_records)
 
-def generate_valid_test_data(num_records: int = 1) -> list:
+def make_test_corpus(num_records: int = 1, seed: int | None = None,
+                     anchor_date: str = '2025-01-01') -> Dict[str, np.ndarray]:
+    """
+    Generates columnar test data: one numpy array per field instead of a list of records.
+
+    :param num_records: Number of records to generate.
+    :param seed: Seed for the random generators, None for random data.
+    :param anchor_date: Date the ages are counted from, fixed so seeded data is reproducible.
+    :return: Dictionary of column name to array of values.
+    """
+    rng = np.random.default_rng(seed)
+    fake = faker.Faker()
+    fake.seed_instance(seed)
+    # Генерация даты рождения в диапазоне от 20 до 60 лет назад
+    birth_dates = np.datetime64(anchor_date, 'D') - rng.integers(20 * 365, 60 * 365, num_records)
+    return {
+        "company": rng.choice(TestData.COMPANIES, num_records),
+        "last_name": np.array([fake.last_name() for _ in range(num_records)], dtype=object),
+        "first_name": np.array([fake.first_name() for _ in range(num_records)], dtype=object),
+        "position": rng.choice(TestData.POSITIONS, num_records),
+        "gift_category": rng.choice(TestData.GIFT_CATEGORIES, num_records),
+        "birth_date": np.datetime_as_string(birth_dates, unit='D'),
+        # Генерация notice_before_days как случайного значения от 1 до 30 дней
+        "notice_before_days": rng.integers(1, 31, num_records, dtype=np.int16),
+    }
+
+
+def generate_valid_test_data(num_records: int = 1, seed: int | None = None) -> list:
     """
     Generates test data for a database table.
 
     :param num_records: Number of records to generate.
+    :param seed: Seed for the random generators, None for random data.
     :return: List of dictionaries with generated test data.
     """
-    fake = faker.Faker()
-    test_data = []
-    for _ in range(num_records):
-        company = random.choice(TestData.COMPANIES)
-        last_name = fake.last_name()
-        first_name = fake.first_name()
-        position = random.choice(TestData.POSITIONS)
-        gift_category = random.choice(TestData.GIFT_CATEGORIES)
-
-        # Генерация даты рождения в диапазоне от 20 до 60 лет назад
-        birth_date = fake.date_of_birth(minimum_age=20, maximum_age=60).strftime('%Y-%m-%d')
-
-        # Генерация notice_before как случайного значения от 1 до 30 дней
-        notice_before = random.randint(1, 30)
-
-        # Формирование записи
-        record = {
-            "company": company,
-            "last_name": last_name,
-            "first_name": first_name,
-            "position": position,
-            "gift_category": gift_category,
-            "birth_date": birth_date,
-            "notice_before": notice_before
-        }
-        test_data.append(record)
-    return test_data
+    return pd.DataFrame(make_test_corpus(num_records, seed)).to_dict('records')
+
+
+@pytest.fixture(scope="module")
+def workers(random_user_id):
+    """
+    Enters TGUser, TGUserData and CSVHandler context managers once per test module.
+
+    :return: Tuple of (user handler, user data handler, csv handler).
+    """
+    with contextlib.ExitStack() as stack:
+        tmp_user_handler = stack.enter_context(TGUser(random_user_id))
+        # удаляем пользователя из базы в любом случае
+        stack.callback(tmp_user_handler.del_info)
+        tmp_user_data = stack.enter_context(TGUserData(random_user_id))
+        tmp_csv_handler = stack.enter_context(CSVHandler())
+        yield tmp_user_handler, tmp_user_data, tmp_csv_handler
+
+
+@pytest.fixture
+def operator(random_user_id):
+    """
+    Operator of a separate test user with an empty data table, its data is deleted after the test.
+    """
+    tmp_operator = Operator(random_user_id + 1)
+    yield tmp_operator
+    tmp_operator.del_info()
 
 
 @pytest.fixture(scope="class")
-def csv_handler():
-    with CSVHandler() as tmp_csv_handler:
-        yield tmp_csv_handler
+def csv_handler(workers):
+    return workers[2]
+
 
+@pytest.fixture(scope="class")
+def sample_record(csv_handler) -> dict:
+    """Single valid record mapped to the data column names, built once per test class."""
+    return dict(zip(csv_handler.data_column_names, get_test_data(1)[0]))
 
 
 @pytest.fixture(scope="class")
-def random_user(random_user_id):  # Возвращает логин
-    with TGUser(random_user_id) as tmp_user_handler:
-        yield tmp_user_handler
-        # удаляем пользователя из базы в любом случае
-        tmp_user_handler.del_info()
+def random_user(workers):  # Возвращает логин
+    return workers[0]
 
 
 @pytest.fixture(scope="class")
-def user_data(random_user_id):
-    with TGUserData(random_user_id) as tmp_user_data:
-        yield tmp_user_data
+def user_data(workers):
+    return workers[1]
 
 
 def get_csv(test_data: List[Dict[str, str]]) -> Path:
@@ -99,7 +157,7 @@ def get_csv(test_data: List[Dict[str, str]]) -> Path:
 
     try:
         df = pd.DataFrame(test_data)
-        target_output = Path(CONFIG.CSV.EXPORT_DATA.path, 'test_data.csv')
+        target_output = Path(CONFIG.CSV.EXPORT_DATA.path, TEST_CSV_NAME)
         df.to_csv(target_output, **CONFIG.CSV.EXPORT_DATA.to_csv)
         print(f"Test data successfully saved to {target_output}")
         return target_output
@@ -108,13 +166,24 @@ def get_csv(test_data: List[Dict[str, str]]) -> Path:
         print(f"An error occurred while saving to CSV: {e}")
 
 
+def make_df(csv_handler: CSVHandler, num_records: int = 1) -> pd.DataFrame:
+    """
+    Builds a prepared DataFrame of test records without the CSV round trip,
+    for the tests where reading CSV files is not the subject.
+
+    :param csv_handler: CSVHandler preparing the data.
+    :param num_records: Number of records to generate. If 0 returns whole set
+    :return: Prepared DataFrame with the test data.
+    """
+    df = pd.DataFrame(get_test_data(num_records), columns=csv_handler.data_column_names)
+    return csv_handler.prepare_dataframe(df)
+
+
 # Clean up: Remove the temporary files after the tests
 @pytest.fixture(autouse=True)
 def cleanup_temp_files(config):
     yield
-    target_output = Path(config.CSV.EXPORT_DATA.path, 'test_data.csv')
-    if target_output.is_file():
-        target_output.unlink()
+    Path(config.CSV.EXPORT_DATA.path, TEST_CSV_NAME).unlink(missing_ok=True)
 
 @pytest_asyncio.fixture(loop_scope="class")
 async def quote_fetcher():
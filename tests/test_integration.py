@@ -1,12 +1,15 @@
-from freezegun import freeze_time
 import pytest
 import sqlite3
+import contextlib
+import pandas as pd
 from mko_birth_reminder_bot.core import TGUsers
-from tests.conftest import get_csv, get_test_data, csv_handler
+from mko_birth_reminder_bot.operator import Operator
+from tests.conftest import get_csv, get_test_data, generate_valid_test_data, make_df, csv_handler
 from mko_birth_reminder_bot.core.utils import (rows_to_dict_list)
 from .test_data import TestData
 import mko_birth_reminder_bot.core.errors as errors
 from pathlib import Path
+from datetime import datetime
 from unittest.mock import AsyncMock
 
 
@@ -44,11 +47,32 @@ class TestCSVReader:
         except Exception as e:
             pytest.fail(f"Fail to del_info: {e}")
 
+    def test_read_csv_chunks(self, csv_handler):
+        valid_test_csv = get_csv(get_test_data(0))
+        chunks = list(csv_handler.read_csv_chunks(valid_test_csv, chunksize=10))
+        assert [len(df) for df in chunks[:-1]] == [10] * (len(chunks) - 1)
+        assert sum(len(df) for df in chunks) == len(get_test_data(0))
+
     def test_read_wrong_columns_data(self, csv_handler):
         valid_test_csv = get_csv(TestData.invalid_data_wrong_col_num)
         with pytest.raises(errors.ColumnMismatch):
             csv_handler.read_csv(valid_test_csv)
 
+    def test_read_wrong_columns_header_only(self, csv_handler, monkeypatch):
+        header_only_csv = get_csv({"first": [], "second": []})
+        # whether a chunked reader yields an empty chunk for a header-only file depends on the pandas version,
+        # the header must be checked even if it yields no chunk at all
+        read_csv = pd.read_csv
+
+        def read_csv_without_chunks(*args, chunksize=None, **kwargs):
+            if chunksize is None:
+                return read_csv(*args, **kwargs)
+            return contextlib.nullcontext(iter(()))
+
+        monkeypatch.setattr(pd, "read_csv", read_csv_without_chunks)
+        with pytest.raises(errors.ColumnMismatch):
+            list(csv_handler.read_csv_chunks(header_only_csv, chunksize=10))
+
     def test_read_invalid_valid_data(self, csv_handler):
         try:
             valid_test_csv = get_csv(get_test_data(0, False))
@@ -91,9 +115,7 @@ class TestTGUser:
 
     def test_data_load(self, random_user, csv_handler, user_data):
         try:
-            valid_test_csv = get_csv(get_test_data(20))
-            df = csv_handler.read_csv(valid_test_csv)
-            df = csv_handler.prepare_dataframe(df)
+            df = make_df(csv_handler, 20)
             # user_data.data_tbl_name = random_user.tg_user_id
             user_data.add_data(df)
         except Exception as e:
@@ -113,21 +135,20 @@ class TestTGUser:
         except Exception as e:
             pytest.fail(f"Fail to flush_data: {e}")
 
-    def test_add_record(self, random_user, user_data, csv_handler):
+    def test_add_record(self, random_user, user_data, sample_record):
         try:
             # user_data._data_tbl_name = random_user.tg_user_id
             user_data.flush_data()
-            data = dict(zip(csv_handler.data_column_names, get_test_data(1)[0]))
-            user_data.add_record(**data)
+            user_data.add_record(**sample_record)
         except Exception as e:
             pytest.fail(f"Fail to add_record: {e}")
 
-    def test_get_record(self, random_user, user_data, csv_handler):
+    def test_get_record(self, random_user, user_data, sample_record):
         try:
             # user_data._data_tbl_name = random_user.tg_user_id
             user_data.flush_data()
-            data = dict(zip(csv_handler.data_column_names, get_test_data(1)[0]))
-            user_data.add_record(**data)
+            df = pd.DataFrame([sample_record])
+            user_data.add_data(df)
             assert user_data.get_record_by_id("SELECT") is None
             assert user_data.get_record_by_id(2) is None
             assert len(user_data.get_record_by_id(1)) == len(user_data.column_names)  # 8 столбцов в таблице с данными
@@ -135,13 +156,13 @@ class TestTGUser:
         except Exception as e:
             pytest.fail(f"Fail get_record: {e}")
 
-    def test_update_record(self, random_user, user_data, csv_handler):
+    def test_update_record(self, random_user, user_data, sample_record):
         try:
             # user_data._data_tbl_name = random_user.tg_user_id
             user_data.flush_data()
 
-            data = dict(zip(csv_handler.data_column_names, get_test_data(1)[0]))
-            user_data.add_record(**data)
+            df = pd.DataFrame([sample_record])
+            user_data.add_data(df)
             user_data.update_record_by_id(record_id=1, birth_date="1999/01/01")
             updated_record = user_data.get_record_by_id(1)
             assert updated_record["birth_date"] == "1999-01-01"
@@ -166,14 +187,13 @@ class TestTGUser:
         except Exception as e:
             pytest.fail(f"Fail update_record: {e}")
 
-    def test_delete_record(self, random_user, user_data, csv_handler):
+    def test_delete_record(self, random_user, user_data, sample_record):
         try:
             # user_data._data_tbl_name = "id_" + str(random_user.tg_user_id)
             user_data.flush_data()
 
             # adding record and testing it is there
-            data = dict(zip(csv_handler.data_column_names, get_test_data(1)[0]))
-            user_data.add_record(**data)
+            user_data.add_record(**sample_record)
             assert len(user_data.get_record_by_id(1)) == len(user_data.column_names)
 
             # trying to delete but wrong id - should be 1
@@ -202,9 +222,7 @@ class TestTGUser:
 
     def test_full_data_load(self, random_user, csv_handler, user_data):
         try:
-            valid_test_csv = get_csv(get_test_data(0))
-            df = csv_handler.read_csv(valid_test_csv)
-            df = csv_handler.prepare_dataframe(df)
+            df = make_df(csv_handler, 0)
             # user_data._data_tbl_name = random_user.tg_user_id
             user_data.add_data(df)
         except Exception as e:
@@ -219,18 +237,27 @@ class TestTGUser:
         except Exception as e:
             pytest.fail(f"Fail to export_data: {e}")
 
-    @freeze_time("2025-08-29 12:00:00")
-    def test_default_reminders(self, user_data):
-        test = []
-        for i in [0, 1, 3, 7]:
-            if x := user_data._get_upcoming_dates(i):
-                test.append(rows_to_dict_list(x))
-        print(test)
-        assert len(test) == 4, f'Not all records got from test_data{test}'
+    @pytest.mark.parametrize("notice_period_days", [0, 1, 3, 7])
+    def test_default_reminders(self, user_data, notice_period_days):
+        rows = user_data._get_upcoming_dates(notice_period_days, date=datetime(2025, 8, 29, 12), tuple_rows=True)
+        assert rows, f'No records got from test_data for {notice_period_days} days notice'
+
+    def test_bulk_reminders(self, user_data):
+        date = datetime(2025, 8, 29, 12)
+        single = {row for i in [0, 1, 3, 7] for row in user_data._get_upcoming_dates(i, date=date, tuple_rows=True)}
+        bulk = user_data._get_upcoming_dates_bulk([0, 1, 3, 7], date=date, tuple_rows=True)
+        assert len(bulk) == len(single) > 0
+        assert set(bulk) == single
+        expected = {tuple(row) for i in user_data.default_notice for row in user_data._get_upcoming_dates(i, date=date)}
+        assert {tuple(record.values()) for record in user_data.get_default_reminders(date=date)} == expected
+
+    def test_all_reminders(self, user_data):
+        reminders = user_data.get_all_reminders(date=datetime(2025, 12, 20, 12))
+        assert reminders["header"] == user_data.column_names
+        assert len(reminders["items"]) == len(set(reminders["items"])) > 0
 
-    @freeze_time("2025-12-20 12:00:00")
     def test_custom_reminders(self, user_data):
-        data = rows_to_dict_list(user_data._get_upcoming_dates_custom_column())
+        data = rows_to_dict_list(user_data._get_upcoming_dates_custom_column(date=datetime(2025, 12, 20, 12)))
         assert len(data) == 6
 
     def test_del_info(self, random_user):
@@ -241,6 +268,39 @@ class TestTGUser:
             pytest.fail(f"Fail to del_info: {e}")
 
 
+class TestOperator:
+    def test_import_data_chunks(self, operator):
+        valid_test_csv = get_csv(get_test_data(0))
+        total = len(get_test_data(0))
+        messages = list(operator.import_data_iter(valid_test_csv, chunksize=10))
+
+        # a progress message before every chunk after the first one, then the result
+        assert messages[:-1] == [f"Read {read} rows, loading the next part of the file..."
+                                 for read in range(10, total, 10)]
+        assert messages[-1] == f"Data successfully imported. Number of rows: {total}."
+        assert operator.records_count == operator.user_data.count_records() == total
+
+    def test_import_generated_data(self, operator):
+        records = generate_valid_test_data(150, seed=1)
+        assert generate_valid_test_data(150, seed=1) == records, "Seeded test data is not reproducible"
+        messages = list(operator.import_data_iter(get_csv(records), chunksize=50))
+
+        assert messages[-1] == "Data successfully imported. Number of rows: 150."
+        stored = operator.user_data.get_record_by_id(1)
+        assert {column: stored[column] for column in records[0]} == records[0]
+
+    def test_import_data_records_limit(self, operator, monkeypatch):
+        monkeypatch.setattr(Operator, "USERS_LIMIT", 15)
+        valid_test_csv = get_csv(get_test_data(0))
+        messages = list(operator.import_data_iter(valid_test_csv, chunksize=10))
+
+        # the second chunk exceeds the limit, the file is rejected without importing the first one
+        assert messages[0] == "Read 10 rows, loading the next part of the file..."
+        assert "The file contains at least 20 records" in messages[-1]
+        assert len(messages) == 2
+        assert operator.records_count == operator.user_data.count_records() == 0
+
+
 @pytest.mark.asyncio(scope="class")
 class TestQFetch:
 
@@ -0,0 +1,326 @@
+import pytest
+from math import inf
+from unittest.mock import AsyncMock, MagicMock
+from cachetools import TTLCache
+from telethon.events import StopPropagation
+import mko_birth_reminder_bot.tgbot as tgbot
+from mko_birth_reminder_bot.core.config import TelethonApiSettings
+
+
+class Clock:
+    """Monotonic clock of the tests, moves only when advanced."""
+
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    fake_clock = Clock()
+    monkeypatch.setattr(tgbot, "monotonic", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list:
+    """Records the delays of `asyncio.sleep` instead of sleeping."""
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(tgbot.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+class TestRequestTimes:
+    def test_empty(self):
+        times = tgbot.RequestTimes(3)
+        assert times.nth_latest(1) == times.nth_latest(3) == -inf
+
+    def test_wraps_around(self):
+        times = tgbot.RequestTimes(3)
+        for time in [1.0, 2.0, 3.0, 4.0]:
+            times.add(time)
+        # the oldest time is overwritten, the latest ones are kept in order
+        assert [times.nth_latest(n) for n in (1, 2, 3)] == [4.0, 3.0, 2.0]
+
+
+class TestInMemoryThrottle:
+    @pytest.mark.asyncio
+    async def test_window(self, clock):
+        throttle = tgbot.InMemoryThrottle({"text": [2, 10]})
+        assert not await throttle.check(1, "text")
+        assert not await throttle.check(1, "text")
+        assert await throttle.check(1, "text")
+        # throttled requests are not recorded, the window is counted from the accepted ones
+        clock.advance(9.9)
+        assert await throttle.check(1, "text")
+        clock.advance(0.1)
+        assert not await throttle.check(1, "text")
+
+    @pytest.mark.asyncio
+    async def test_users_and_commands(self, clock):
+        throttle = tgbot.InMemoryThrottle({"text": [1, 10]}, default=(3, 10))
+        assert not await throttle.check(1, "text")
+        assert await throttle.check(1, "text")
+        assert not await throttle.check(2, "text")
+        # the default limit applies to the commands missing in the limits
+        assert not await throttle.check(3, "callback")
+        assert not await throttle.check(3, "callback")
+        assert not await throttle.check(3, "callback")
+        assert await throttle.check(3, "callback")
+
+    @pytest.mark.asyncio
+    async def test_evict(self, clock):
+        throttle = tgbot.InMemoryThrottle({"text": [2, 10], "callback": [2, 30]})
+        await throttle.check(1, "text")
+        clock.advance(25)
+        await throttle.check(2, "text")
+        clock.advance(10)
+        # user 1 is idle for longer than the longest period, user 2 is not
+        throttle.evict()
+        assert list(throttle._requests) == [2]
+
+    def test_no_limits(self):
+        throttle = tgbot.InMemoryThrottle({}, default=(4, 10))
+        assert throttle.size == 4
+        assert throttle.max_period == 10
+
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+    async def test_spacing(self, clock, sleeps):
+        limiter = tgbot.RateLimiter(10)
+        for _ in range(3):
+            await limiter.wait()
+        assert sleeps == pytest.approx([0.1, 0.2])
+
+    async def test_idle_limiter_does_not_wait(self, clock, sleeps):
+        limiter = tgbot.RateLimiter(10)
+        await limiter.wait()
+        clock.advance(1)
+        await limiter.wait()
+        assert sleeps == []
+
+    async def test_paced(self, clock, sleeps, monkeypatch):
+        monkeypatch.setattr(tgbot, "send_limiter", tgbot.RateLimiter(10))
+        request = AsyncMock(return_value="sent")
+        assert await tgbot.paced(request, 1, text="a") == "sent"
+        assert await tgbot.paced(request, 2, text="b") == "sent"
+        request.assert_awaited_with(2, text="b")
+        assert sleeps == pytest.approx([0.1])
+
+
+@pytest.mark.asyncio
+class TestThrottleNotice:
+    @pytest.fixture(autouse=True)
+    def bot_state(self, monkeypatch, clock):
+        monkeypatch.setattr(tgbot, "throttle", tgbot.InMemoryThrottle({"text": [1, 10], "callback": [1, 10]}))
+        monkeypatch.setattr(tgbot, "throttle_notices", TTLCache(maxsize=10, ttl=10, timer=clock))
+        # the notices must not wait for the send slots shared by all users
+        monkeypatch.setattr(tgbot, "send_limiter", MagicMock(wait=AsyncMock(side_effect=AssertionError)))
+
+    async def test_text(self, clock):
+        event = MagicMock(sender_id=1, respond=AsyncMock())
+        await tgbot.throttle_filter_text(event)
+        for _ in range(5):
+            with pytest.raises(StopPropagation):
+                await tgbot.throttle_filter_text(event)
+        event.respond.assert_awaited_once()
+        clock.advance(10)
+        await tgbot.throttle_filter_text(event)
+        with pytest.raises(StopPropagation):
+            await tgbot.throttle_filter_text(event)
+        assert event.respond.await_count == 2
+
+    async def test_callback(self, clock, monkeypatch):
+        monkeypatch.setattr(tgbot, "session_store", tgbot.InMemorySessionStore(maxsize=10, ttl=60))
+        await tgbot.session_store.set(1, tgbot.UserSession())
+        event = MagicMock(sender_id=1, answer=AsyncMock())
+        await tgbot.throttle_filter_callback(event)
+        for _ in range(5):
+            with pytest.raises(StopPropagation):
+                await tgbot.throttle_filter_callback(event)
+        event.answer.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+class TestSessionStore:
+    async def test_get_renews_ttl(self, clock):
+        store = tgbot.InMemorySessionStore(maxsize=10, ttl=10)
+        store._sessions = TTLCache(maxsize=10, ttl=10, timer=clock)
+        session = tgbot.UserSession()
+        await store.set(1, session)
+        clock.advance(8)
+        assert await store.get(1) is session
+        clock.advance(8)
+        assert await store.get(1) is session
+        clock.advance(11)
+        assert await store.get(1) is None
+
+    async def test_delete(self):
+        store = tgbot.InMemorySessionStore(maxsize=10, ttl=10)
+        await store.set(1, tgbot.UserSession())
+        await store.delete(1)
+        await store.delete(1)
+        assert await store.get(1) is None
+
+
+@pytest.mark.asyncio
+class TestDebounce:
+    @pytest.fixture(autouse=True)
+    def bot_state(self, monkeypatch, clock):
+        monkeypatch.setattr(tgbot, "throttle", tgbot.InMemoryThrottle({}, default=(100, 10)))
+        monkeypatch.setattr(tgbot, "session_store", tgbot.InMemorySessionStore(maxsize=10, ttl=60))
+        monkeypatch.setattr(tgbot, "send_limiter", tgbot.RateLimiter(1000))
+        monkeypatch.setattr(tgbot, "throttle_notices", TTLCache(maxsize=10, ttl=10, timer=clock))
+        monkeypatch.setattr(tgbot.CONFIG.TELETHON_API, "debounce_interval", 0.3)
+
+    @staticmethod
+    def press(user_id: int = 1) -> MagicMock:
+        return MagicMock(sender_id=user_id, answer=AsyncMock())
+
+    async def test_repeated_press(self, clock):
+        await tgbot.session_store.set(1, tgbot.UserSession())
+        await tgbot.throttle_filter_callback(self.press())
+        clock.advance(0.1)
+        event = self.press()
+        with pytest.raises(StopPropagation):
+            await tgbot.throttle_filter_callback(event)
+        event.answer.assert_awaited_once()
+        clock.advance(0.3)
+        await tgbot.throttle_filter_callback(self.press())
+
+    async def test_busy(self, clock):
+        session = await tgbot.get_session(1)
+        session.busy = True
+        with pytest.raises(StopPropagation):
+            await tgbot.throttle_filter_callback(self.press())
+        # other users are not affected
+        await tgbot.throttle_filter_callback(self.press(2))
+
+    async def test_no_session(self):
+        # a stale button of a user without a session is passed on, no session is created for it
+        await tgbot.throttle_filter_callback(self.press())
+        await tgbot.throttle_filter_callback(self.press())
+        assert await tgbot.session_store.get(1) is None
+
+
+@pytest.mark.asyncio
+class TestUserLocks:
+    @pytest.fixture(autouse=True)
+    def locks(self, monkeypatch):
+        monkeypatch.setattr(tgbot, "user_locks", {})
+        monkeypatch.setattr(tgbot, "lock_users", {})
+
+    async def test_kept_while_awaited(self):
+        entered = []
+
+        async def handler(name):
+            async with tgbot.lock_for(1):
+                entered.append(name)
+                await tgbot.asyncio.sleep(0)
+
+        async with tgbot.lock_for(1):
+            lock = tgbot.user_locks[1]
+            waiters = [tgbot.asyncio.create_task(handler(name)) for name in "ab"]
+            await tgbot.asyncio.sleep(0)
+            assert tgbot.lock_users[1] == 3
+        # released, but the waiters still use the same lock
+        assert tgbot.user_locks[1] is lock
+        await tgbot.asyncio.gather(*waiters)
+        assert entered == ["a", "b"]
+        assert tgbot.user_locks == tgbot.lock_users == {}
+
+    async def test_dropped_on_error(self):
+        with pytest.raises(ValueError):
+            async with tgbot.lock_for(1):
+                raise ValueError
+        assert tgbot.user_locks == tgbot.lock_users == {}
+
+
+@pytest.mark.asyncio
+class TestCsvUpload:
+    @pytest.fixture(autouse=True)
+    def bot_state(self, monkeypatch):
+        monkeypatch.setattr(tgbot, "session_store", tgbot.InMemorySessionStore(maxsize=10, ttl=60))
+        monkeypatch.setattr(tgbot, "send_limiter", tgbot.RateLimiter(1000))
+        monkeypatch.setattr(tgbot, "show_start_menu", AsyncMock())
+        monkeypatch.setattr(tgbot, "client", MagicMock(download_file=AsyncMock()))
+
+    @staticmethod
+    def upload() -> MagicMock:
+        event = MagicMock(respond=AsyncMock(return_value=MagicMock(respond=AsyncMock())))
+        event.file.mime_type = "text/csv"
+        event.file.size = 10
+        return event
+
+    async def test_removed_after_import(self, tmp_path, monkeypatch):
+        await tgbot.session_store.set(1, tgbot.UserSession())
+        operator = MagicMock(import_data_iter=MagicMock(side_effect=lambda file: iter([file.read_text()])))
+        monkeypatch.setattr(tgbot, "get_operator", AsyncMock(return_value=operator))
+        tgbot.client.download_file.side_effect = lambda media, f, **kwargs: f.write(b"data")
+        # the upload directory default is bound when the module is imported
+        monkeypatch.setattr(tgbot.save_csv_file, "__defaults__", (tmp_path,))
+        event = self.upload()
+        await tgbot.handle_import_csv(event, 1)
+        event.respond.return_value.respond.assert_awaited_once_with("data")
+        assert list(tmp_path.iterdir()) == []
+        assert (await tgbot.session_store.get(1)).params["csv"] is None
+
+    async def test_removed_after_failed_download(self, tmp_path):
+        await tgbot.session_store.set(1, tgbot.UserSession())
+        tgbot.client.download_file.side_effect = ConnectionError("lost")
+        assert await tgbot.save_csv_file(self.upload(), 1, upload_dir=tmp_path) == "Error saving file: lost"
+        assert list(tmp_path.iterdir()) == []
+        assert (await tgbot.session_store.get(1)).params["csv"] is None
+
+
+class TestMenu:
+    def test_matcher_from_list(self):
+        matcher = tgbot.matcher_from_list(["company", "position"])
+        assert matcher(b"company")
+        assert not matcher(b"comp")
+        assert not matcher(b"birth_date")
+
+    def test_validate_menu(self):
+        menu = {"start": [[{"add_record": "Add"}, ("export_csv", "Export")], [{"a": "A", "b": "B"}]]}
+        assert TelethonApiSettings.validate_menu(menu) == {
+            "start": [[("add_record", "Add"), ("export_csv", "Export")], [("a", "A"), ("b", "B")]]
+        }
+
+
+@pytest.mark.asyncio
+class TestOnMessage:
+    @pytest.fixture
+    def handlers(self, monkeypatch) -> dict:
+        handlers = {"/start": AsyncMock(), "text": AsyncMock()}
+        monkeypatch.setattr(tgbot, "COMMANDS", {"/start": handlers["/start"]})
+        monkeypatch.setattr(tgbot, "handle_text", handlers["text"])
+        monkeypatch.setattr(tgbot, "bot_username", "botname")
+        return handlers
+
+    @pytest.mark.parametrize("text", ["/start", "/start@BotName", "/start@botname now"])
+    async def test_command(self, handlers, text):
+        await tgbot.on_message(MagicMock(raw_text=text))
+        handlers["/start"].assert_awaited_once()
+        handlers["text"].assert_not_awaited()
+
+    @pytest.mark.parametrize("text", ["", "start", "/stop@BotName", "name@example.com"])
+    async def test_text(self, handlers, text):
+        await tgbot.on_message(MagicMock(raw_text=text))
+        handlers["text"].assert_awaited_once()
+        handlers["/start"].assert_not_awaited()
+
+    @pytest.mark.parametrize("text", ["/start@OtherBot", "/stop@OtherBot now"])
+    async def test_other_bot(self, handlers, text):
+        await tgbot.on_message(MagicMock(raw_text=text))
+        handlers["text"].assert_not_awaited()
+        handlers["/start"].assert_not_awaited()